@@ -12,68 +12,327 @@ Each manifest contains either:
 - "directories": list of subdirectories with their manifest paths
 - "files": list of files with metadata (name, path, size, updated, hash)
 
-File hash: SHA256 of file content for integrity verification
+File updated: last commit time from git history, falling back to the
+file system modification time for files git does not know about
+File hash: SHA256 of file content for integrity verification, cached in
+.manifest_cache.json by (size, mtime) so unchanged files are not re-hashed
 """
 
+import argparse
 import hashlib
 import json
-from datetime import datetime, timezone
+import mmap
+import os
+import ssl
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from operator import attrgetter
 from pathlib import Path
 
-
-def calculate_file_hash(file_path: Path) -> str:
+# hashlib releases the GIL while hashing, so threads are enough to hash in parallel
+MAX_WORKERS = min(32, os.cpu_count() or 1)
+# Files at least this large are memory-mapped for hashing
+MMAP_THRESHOLD = 8 * 1024 * 1024
+# Read buffer size for hashing when hashlib.file_digest is unavailable
+HASH_BUFFER_SIZE = 1024 * 1024
+# How many files ahead of the last finished hash to request read-ahead for
+PREFETCH_AHEAD = 2 * MAX_WORKERS
+# Only recurse into subdirectories in parallel when there are more than this many
+PARALLEL_SUBDIR_THRESHOLD = 4
+# SHA256 throughput below this (bytes/s) suggests OpenSSL is not using SHA extensions
+MIN_HASH_THROUGHPUT = 1024 * 1024 * 1024
+# Whether files can be listed, stat'ed and opened relative to a directory descriptor
+SUPPORTS_DIR_FD = (
+    os.scandir in os.supports_fd and os.stat in os.supports_dir_fd and os.open in os.supports_dir_fd
+)
+# Hash cache file name, kept at the repository root so it is not deployed with M9A/
+HASH_CACHE_NAME = ".manifest_cache.json"
+
+
+def calculate_file_hash(file_path: str | Path, size: int, dir_fd: int | None = None) -> str:
     """
     Calculate SHA256 hash of a file.
 
     Args:
-        file_path: Path to the file
+        file_path: Path to the file, relative to dir_fd if given
+        size: File size in bytes, as already known from the caller's stat
+        dir_fd: Optional file descriptor of the directory containing the file
 
     Returns:
         Hex string of SHA256 hash
     """
-    sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        # Read in chunks to handle large files
-        for chunk in iter(lambda: f.read(8192), b""):
-            sha256.update(chunk)
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0), dir_fd=dir_fd)
+    # Unbuffered: every read path below fills its own buffer or maps the file
+    with open(fd, "rb", buffering=0) as f:
+        if size >= MMAP_THRESHOLD:
+            # Large files: hash the whole mapping at once, without copying into Python bytes
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                return hashlib.sha256(mapped).hexdigest()
+
+        if hasattr(os, "posix_fadvise"):
+            # The file is read front to back, so let the kernel use a larger read-ahead window
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: read and hash in C
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+        # Read in chunks into a reused buffer to handle large files
+        sha256 = hashlib.sha256()
+        buffer = bytearray(HASH_BUFFER_SIZE)
+        view = memoryview(buffer)
+        while n := f.readinto(buffer):
+            sha256.update(view[:n])
     return sha256.hexdigest()
 
 
+def prefetch_file(file_path: str | Path, dir_fd: int | None = None):
+    """
+    Ask the kernel to start reading a file into the page cache.
+
+    Args:
+        file_path: Path to the file, relative to dir_fd if given
+        dir_fd: Optional file descriptor of the directory containing the file
+    """
+    # Only a hint: a file that cannot be opened or advised is just not prefetched
+    try:
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0), dir_fd=dir_fd)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def check_hash_throughput():
+    """Print the OpenSSL version and warn if SHA256 looks hardware-unaccelerated."""
+    data = bytes(1024 * 1024)
+    rounds = 16
+    start = time.perf_counter()
+    for _ in range(rounds):
+        hashlib.sha256(data).digest()
+    throughput = len(data) * rounds / (time.perf_counter() - start)
+
+    print(f"OpenSSL: {ssl.OPENSSL_VERSION}, SHA256: {throughput / 1024 / 1024:.0f} MiB/s")
+    if throughput < MIN_HASH_THROUGHPUT:
+        print(
+            "Warning: SHA256 is slow, OpenSSL may not be using SHA-NI/ARMv8 SHA extensions; "
+            "consider a Python build linked against OpenSSL 3.x"
+        )
+
+
+def run_git(cwd: Path, *args: str) -> str:
+    """
+    Run a git command and return its output.
+
+    Args:
+        cwd: Directory to run git in
+        args: Arguments after "git"; pathspecs are taken literally, not as globs
+
+    Returns:
+        Standard output, decoded like os.scandir names so non-UTF-8 paths still match
+    """
+    return subprocess.run(
+        ["git", "--literal-pathspecs", *args],
+        cwd=cwd,
+        capture_output=True,
+        encoding="utf-8",
+        errors="surrogateescape",
+        check=True,
+    ).stdout
+
+
+def load_git_mtimes(api_root: Path) -> dict[str, int]:
+    """
+    Load the last commit time of every file under api_root.
+
+    Only files unchanged since the last commit are included; callers fall back to
+    the file system mtime for the rest. One git log covers all files. Files changed by a merge are looked up one by one
+    with "git log -1", since a single walk lists no files for merge commits and cannot
+    reproduce git's per-file history simplification across branches.
+
+    Args:
+        api_root: Path to the api directory
+
+    Returns:
+        Dict mapping paths relative to api_root to commit times in milliseconds,
+        empty if git or the repository history is unavailable
+    """
+    git_mtimes = {}
+    try:
+        log_output = run_git(
+            api_root,
+            "log",
+            "-z",
+            "--format=%x00%at",
+            "--name-only",
+            "--diff-filter=AMR",
+            "--relative",
+            "--",
+            ".",
+        )
+        # Each commit is "\0<time>\0\n<path>\0<path>\0..."; paths are unquoted and never
+        # contain NUL, so NUL-separated fields are safe for any file name
+        for record in log_output.split("\0\0"):
+            commit_time, _, paths = record.strip("\0").partition("\0\n")
+            if not paths:
+                continue
+            commit_time_ms = int(commit_time) * 1000
+            # git log lists the newest commits first, so keep the first time seen per file
+            for path in paths.split("\0"):
+                if path not in git_mtimes:
+                    git_mtimes[path] = commit_time_ms
+
+        # Every path a merge changed relative to any of its parents
+        merged_output = run_git(
+            api_root,
+            "log",
+            "--merges",
+            "-m",
+            "-z",
+            "--format=",
+            "--name-only",
+            "--relative",
+            "--",
+            ".",
+        )
+        for path in set(filter(None, merged_output.split("\0"))):
+            if (api_root / path).is_file():
+                commit_time = run_git(api_root, "log", "-1", "--format=%at", "--", path)
+                git_mtimes[path] = int(commit_time) * 1000
+
+        # Files edited or staged since the last commit keep their file system mtime
+        dirty_output = run_git(
+            api_root, "diff", "HEAD", "--name-only", "-z", "--relative", "--", "."
+        )
+        for path in dirty_output.split("\0"):
+            git_mtimes.pop(path, None)
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+
+    return git_mtimes
+
+
+def load_hash_cache(cache_path: Path) -> dict[str, list]:
+    """
+    Load the hash cache written by a previous run.
+
+    Args:
+        cache_path: Path to the cache file
+
+    Returns:
+        Dict mapping relative paths to [size, mtime_ns, hash], empty if the
+        cache is missing or unreadable
+    """
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_hash_cache(hash_cache: dict[str, list], cache_path: Path, api_root: Path):
+    """Write the hash cache, dropping entries for files that no longer exist."""
+    hash_cache = {path: entry for path, entry in hash_cache.items() if (api_root / path).is_file()}
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(hash_cache, f, ensure_ascii=False)
+
+
 def get_current_timestamp():
     """Get current UTC timestamp in milliseconds."""
-    return int(datetime.now(timezone.utc).timestamp() * 1000)
+    return time.time_ns() // 1_000_000
 
 
-def generate_file_manifest(directory: Path, api_root: Path) -> dict:
+def generate_file_manifest(
+    directory: Path,
+    api_root: Path,
+    git_mtimes: dict[str, int],
+    hash_cache: dict[str, list],
+    hash_executor: ThreadPoolExecutor,
+) -> dict:
     """
     Generate manifest for a directory containing data files.
 
     Args:
         directory: Path to the directory containing files
         api_root: Path to the api directory (for calculating relative paths)
+        git_mtimes: Commit times by relative path, from load_git_mtimes
+        hash_cache: Cached hashes by relative path, updated in place
+        hash_executor: Thread pool shared by all directories for hashing files
 
     Returns:
         Dict with 'files' list and 'updated' timestamp
     """
     files = []
+    entries = []
+
+    # 计算从 api 根目录开始的相对路径（directory 位于 api_root 之下）
+    relative_dir = str(directory)[len(str(api_root)) + len(os.sep) :].replace(os.sep, "/")
+    relative_prefix = f"{relative_dir}/" if relative_dir else ""
+
+    # Open the directory once so files are looked up relative to it, not by full path
+    dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY) if SUPPORTS_DIR_FD else None
+    try:
+        # Find all files (excluding manifest.json itself)
+        with os.scandir(directory if dir_fd is None else dir_fd) as it:
+            for entry in sorted(it, key=attrgetter("name")):
+                # Skip directories and manifest.json itself
+                if entry.is_dir() or entry.name == "manifest.json":
+                    continue
+                relative_path = relative_prefix + entry.name
+                entries.append((entry, relative_path, entry.stat()))
+
+        # 只对大小或修改时间变化的文件重新计算 hash
+        stale = [
+            (entry, relative_path, stat_info)
+            for entry, relative_path, stat_info in entries
+            if hash_cache.get(relative_path, [])[:2] != [stat_info.st_size, stat_info.st_mtime_ns]
+        ]
+
+        stale_paths = [entry.path for entry, _, _ in stale]
+        can_prefetch = hasattr(os, "posix_fadvise")
+        if can_prefetch:
+            for file_path in stale_paths[:PREFETCH_AHEAD]:
+                prefetch_file(file_path, dir_fd)
+
+        # 并行计算文件 hash
+        hashes = hash_executor.map(
+            partial(calculate_file_hash, dir_fd=dir_fd),
+            stale_paths,
+            [stat_info.st_size for _, _, stat_info in stale],
+        )
+        for i, ((_, relative_path, stat_info), file_hash) in enumerate(zip(stale, hashes)):
+            # 每完成一个文件，就预读后面第 PREFETCH_AHEAD 个文件，让读盘与 hash 计算重叠
+            if can_prefetch and i + PREFETCH_AHEAD < len(stale_paths):
+                prefetch_file(stale_paths[i + PREFETCH_AHEAD], dir_fd)
+            hash_cache[relative_path] = [stat_info.st_size, stat_info.st_mtime_ns, file_hash]
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
 
-    # Find all files (excluding manifest.json itself)
-    for file in sorted(directory.glob("*")):
-        # Skip directories and manifest.json itself
-        if file.is_dir() or file.name == "manifest.json":
-            continue
-
-        stat_info = file.stat()
-        # 使用文件系统的修改时间（毫秒）
-        file_mtime_ms = int(stat_info.st_mtime * 1000)
-        # 计算文件 hash
-        file_hash = calculate_file_hash(file)
-
-        # 计算从 api 根目录开始的相对路径
-        relative_path = file.relative_to(api_root).as_posix()
+    # The directory's updated time is the most recent file time
+    most_recent = 0
+    for entry, relative_path, stat_info in entries:
+        # 优先使用 Git 提交时间，否则使用文件系统的修改时间（毫秒）
+        file_mtime_ms = git_mtimes.get(relative_path)
+        if file_mtime_ms is None:
+            file_mtime_ms = stat_info.st_mtime_ns // 1_000_000
+        if file_mtime_ms > most_recent:
+            most_recent = file_mtime_ms
+        file_hash = hash_cache[relative_path][2]
 
         file_info = {
-            "name": file.name,
+            "name": entry.name,
             "path": relative_path,
             "size": stat_info.st_size,
             "updated": file_mtime_ms,
@@ -81,118 +340,128 @@ def generate_file_manifest(directory: Path, api_root: Path) -> dict:
         }
         files.append(file_info)
 
-    # The directory's updated time is the most recent file time
-    if files:
-        most_recent = max(f["updated"] for f in files)
-    else:
+    if not files:
         most_recent = get_current_timestamp()
 
     return {"files": files, "updated": most_recent}
 
 
-def generate_directory_manifest(api_root: Path, subdirs: list[dict]) -> dict:
+def generate_directory_manifest(subdirs: list[dict]) -> dict:
     """
     Generate manifest for a directory containing subdirectories.
 
     Args:
-        api_root: Path to the api directory (for resolving manifest paths)
-        subdirs: List of subdirectory info dicts with 'name', 'manifest',
-                 and optionally 'updated' keys
+        subdirs: List of subdirectory info dicts with 'name', 'manifest' and
+                 'updated' keys, taken in memory from the recursive calls
 
     Returns:
-        Dict with 'directories' list (with updated timestamps) and 'updated' timestamp
+        Dict with 'directories' list and 'updated' timestamp
     """
-    enriched_subdirs = []
-    for subdir_info in subdirs:
-        if "updated" in subdir_info:
-            # Use the in-memory timestamp from the recursive call (avoids disk I/O)
-            subdir_updated = subdir_info["updated"]
-        else:
-            # Fallback: read from disk for backward compatibility
-            subdir_manifest_path = api_root / subdir_info["manifest"]
-            if subdir_manifest_path.exists():
-                with open(subdir_manifest_path, "r", encoding="utf-8") as f:
-                    subdir_manifest = json.load(f)
-                    subdir_updated = subdir_manifest.get("updated", get_current_timestamp())
-            else:
-                subdir_updated = get_current_timestamp()
-
-        enriched_subdirs.append(
-            {
-                "name": subdir_info["name"],
-                "manifest": subdir_info["manifest"],
-                "updated": subdir_updated,
-            }
-        )
-
     # The directory's updated time is the most recent subdirectory time
-    if enriched_subdirs:
-        most_recent = max(d["updated"] for d in enriched_subdirs)
+    if subdirs:
+        most_recent = max(d["updated"] for d in subdirs)
     else:
         most_recent = get_current_timestamp()
 
-    return {"directories": enriched_subdirs, "updated": most_recent}
+    return {"directories": subdirs, "updated": most_recent}
 
 
-def write_manifest(manifest: dict, output_path: Path):
-    """Write manifest dict to JSON file with pretty formatting."""
+def write_manifest(manifest: dict, output_path: Path, pretty: bool = False):
+    """Write manifest dict to JSON file, compact unless pretty formatting is requested."""
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    # Sorted keys keep the output byte-stable between runs, which also helps gzip
+    if pretty:
+        data = json.dumps(manifest, indent=2, sort_keys=True, ensure_ascii=False)
+    else:
+        data = json.dumps(manifest, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    output_path.write_bytes(data.encode("utf-8"))
     print(f"✓ Generated: {output_path}")
 
 
-def generate_manifests_recursively(directory: Path, api_root: Path) -> dict | None:
+def generate_manifests_recursively(
+    directory: Path,
+    api_root: Path,
+    git_mtimes: dict[str, int],
+    hash_cache: dict[str, list],
+    hash_executor: ThreadPoolExecutor,
+    pretty: bool = False,
+) -> dict | None:
     """
-    Recursively generate manifests for a directory and its subdirectories.
+    Recursively generate and write manifests for a directory and its subdirectories.
 
     Args:
         directory: Path to the directory to process
         api_root: Path to the api directory (for calculating relative paths)
+        git_mtimes: Commit times by relative path, from load_git_mtimes
+        hash_cache: Cached hashes by relative path, updated in place
+        hash_executor: Thread pool shared by all directories for hashing files
+        pretty: Write indented manifests instead of compact ones
 
     Returns:
-        The manifest dict for this directory, or None if directory doesn't exist
+        Dict with the directory's 'name', 'manifest' path and 'updated' timestamp
+        for its parent's manifest, or None if directory doesn't exist
     """
     if not directory.exists():
         return None
 
     # Find all subdirectories (excluding hidden dirs and __pycache__)
-    subdirs = [
-        d
-        for d in sorted(directory.iterdir())
-        if d.is_dir() and not d.name.startswith(".") and d.name != "__pycache__"
-    ]
+    with os.scandir(directory) as it:
+        subdirs = [
+            Path(entry.path)
+            for entry in sorted(it, key=attrgetter("name"))
+            if entry.is_dir() and not entry.name.startswith(".") and entry.name != "__pycache__"
+        ]
 
     # If there are subdirectories, process them recursively
     if subdirs:
-        subdir_manifests = []
-        for subdir in subdirs:
-            subdir_manifest = generate_manifests_recursively(subdir, api_root)
-            if subdir_manifest is not None:
-                # Write the subdirectory's manifest
-                manifest_path = subdir / "manifest.json"
-                write_manifest(subdir_manifest, manifest_path)
-
-                # 计算从 api 根目录开始的相对路径
-                relative_manifest_path = manifest_path.relative_to(api_root).as_posix()
-
-                subdir_manifests.append(
-                    {
-                        "name": subdir.name,
-                        "manifest": relative_manifest_path,
-                        "updated": subdir_manifest["updated"],
-                    }
+        if len(subdirs) > PARALLEL_SUBDIR_THRESHOLD:
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                results = list(
+                    executor.map(
+                        lambda d: generate_manifests_recursively(
+                            d, api_root, git_mtimes, hash_cache, hash_executor, pretty
+                        ),
+                        subdirs,
+                    )
                 )
+        else:
+            results = [
+                generate_manifests_recursively(
+                    d, api_root, git_mtimes, hash_cache, hash_executor, pretty
+                )
+                for d in subdirs
+            ]
 
         # Generate directory manifest with subdirectories
-        return generate_directory_manifest(api_root, subdir_manifests)
+        manifest = generate_directory_manifest([info for info in results if info is not None])
     else:
         # Leaf directory - generate file manifest
-        return generate_file_manifest(directory, api_root)
+        manifest = generate_file_manifest(
+            directory, api_root, git_mtimes, hash_cache, hash_executor
+        )
+
+    # Write this directory's manifest right away; the parent only needs its summary
+    manifest_path = directory / "manifest.json"
+    write_manifest(manifest, manifest_path, pretty)
+
+    # 计算从 api 根目录开始的相对路径（directory 位于 api_root 之下）
+    relative_manifest_path = str(manifest_path)[len(str(api_root)) + len(os.sep) :]
+
+    return {
+        "name": directory.name,
+        "manifest": relative_manifest_path.replace(os.sep, "/"),
+        "updated": manifest["updated"],
+    }
 
 
 def main():
     """Generate all manifest files in the M9A API directory structure."""
+    parser = argparse.ArgumentParser(description="Generate manifest.json files for the M9A API.")
+    parser.add_argument(
+        "--pretty", action="store_true", help="write indented manifests for easier reading"
+    )
+    args = parser.parse_args()
+
     # Get the repository root directory
     repo_root = Path(__file__).resolve().parent.parent
     m9a_root = repo_root / "M9A"
@@ -203,6 +472,7 @@ def main():
 
     print("Generating manifest files...")
     print(f"Base directory: {m9a_root}")
+    check_hash_throughput()
     print()
 
     # Start recursive generation from api directory
@@ -211,9 +481,20 @@ def main():
         print(f"Error: api directory not found at {api_dir}")
         return 1
 
-    api_manifest = generate_manifests_recursively(api_dir, api_dir)
-    if api_manifest:
-        write_manifest(api_manifest, api_dir / "manifest.json")
+    # 一次性读取所有文件的 Git 提交时间
+    git_mtimes = load_git_mtimes(api_dir)
+
+    # 读取上次运行的 hash 缓存
+    hash_cache_path = repo_root / HASH_CACHE_NAME
+    hash_cache = load_hash_cache(hash_cache_path)
+
+    # 所有目录共用一个 hash 线程池：遍历目录的同时，其他目录的文件可以继续计算 hash
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as hash_executor:
+        generate_manifests_recursively(
+            api_dir, api_dir, git_mtimes, hash_cache, hash_executor, args.pretty
+        )
+
+    save_hash_cache(hash_cache, hash_cache_path, api_dir)
 
     print()
     print("✅ All manifest files generated successfully!")
@@ -0,0 +1,107 @@
+"""Tests for generate_manifest.py, run with: python -m unittest discover tools"""
+
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from generate_manifest import load_git_mtimes, prefetch_file
+
+
+class LoadGitMtimesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = Path(self.tmp.name)
+        self.api = self.repo / "M9A" / "api"
+        (self.api / "data").mkdir(parents=True)
+        self.git("init", "-q", "-b", "master")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "test")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def git(self, *args, date=None):
+        env = dict(os.environ)
+        if date is not None:
+            env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"@{date} +0000"
+        return subprocess.run(
+            ["git", *args], cwd=self.repo, env=env, capture_output=True, text=True
+        ).stdout
+
+    def commit(self, date, files, message):
+        for name, content in files.items():
+            (self.api / "data" / name).write_text(content, encoding="utf-8")
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message, date=date)
+
+    def merge(self, date, branch, resolve):
+        # Conflicts are expected here; resolve writes the merged content
+        self.git("merge", "-q", "--no-commit", branch, date=date)
+        resolve()
+        self.git("add", "-A")
+        self.git("commit", "-q", "--no-edit", date=date)
+
+    def assert_matches_per_file_git_log(self):
+        """Compare with the Pages workflow's former `git log -1 --format=%at -- file` loop."""
+        expected = {}
+        for path in self.api.rglob("*"):
+            if path.is_file():
+                relative_path = path.relative_to(self.api).as_posix()
+                commit_time = self.git("log", "-1", "--format=%at", "--", path)
+                expected[relative_path] = int(commit_time) * 1000
+        self.assertEqual(load_git_mtimes(self.api), expected)
+
+    def test_matches_per_file_log_across_merges(self):
+        self.commit(1000000000, {"a.json": "base", "b.json": "base", "c.json": "base"}, "base")
+
+        # Both branches change a.json; the merge resolves the conflict with new content
+        self.git("checkout", "-q", "-b", "side")
+        self.commit(1000009500, {"a.json": "side"}, "side")
+        self.git("checkout", "-q", "master")
+        self.commit(1000009000, {"a.json": "master"}, "master")
+        self.merge(
+            1000010000, "side", lambda: (self.api / "data" / "a.json").write_text("resolved")
+        )
+
+        # Both branches change b.json; the merge keeps the side branch's older version
+        self.git("checkout", "-q", "-b", "side2")
+        self.commit(1000020000, {"b.json": "side2"}, "side2")
+        self.git("checkout", "-q", "master")
+        self.commit(1000020500, {"b.json": "master2", "c.json": "master2"}, "master2")
+        self.merge(1000021000, "side2", lambda: self.git("checkout", "-q", "--theirs", "--", "."))
+
+        self.assert_matches_per_file_git_log()
+
+    def test_linear_history(self):
+        self.commit(1000000000, {"a.json": "1", "b.json": "1"}, "first")
+        self.commit(1000000100, {"a.json": "2"}, "second")
+
+        self.assertEqual(
+            load_git_mtimes(self.api),
+            {"data/a.json": 1000000100000, "data/b.json": 1000000000000},
+        )
+        self.assert_matches_per_file_git_log()
+
+    def test_skips_files_changed_since_last_commit(self):
+        self.commit(1000000000, {"a.json": "1", "b.json": "1", "c.json": "1"}, "first")
+        (self.api / "data" / "a.json").write_text("edited", encoding="utf-8")
+        (self.api / "data" / "b.json").write_text("staged", encoding="utf-8")
+        self.git("add", "M9A/api/data/b.json")
+
+        self.assertEqual(load_git_mtimes(self.api), {"data/c.json": 1000000000000})
+
+    def test_outside_repository(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(load_git_mtimes(Path(directory)), {})
+
+
+class PrefetchFileTest(unittest.TestCase):
+    def test_missing_file_is_ignored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertIsNone(prefetch_file(Path(directory) / "missing.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()